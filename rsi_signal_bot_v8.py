@@ -1,67 +1,141 @@
-import yfinance as yf
-import pandas as pd
-import numpy as np
 import datetime as dt
-import pytz
 import os
+import sys
+from zoneinfo import ZoneInfo
+
+# Timezone
+IST = ZoneInfo("Asia/Kolkata")
+
+# Only run during Indian market hours
+def is_market_open(now):
+    if now.weekday() >= 5:
+        return False
+    return (9, 15) <= (now.hour, now.minute) and now.hour < 15
+
+# Off-hours cron runs exit here, before the heavy imports below
+if __name__ == "__main__" and not is_market_open(dt.datetime.now(IST)):
+    print("🕒 Market closed — skipping run.")
+    sys.exit(0)
+
+import yfinance as yf
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Telegram setup
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_URL = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage" if BOT_TOKEN and CHAT_ID else None
+TELEGRAM_MAX_LEN = 4096
+SIGNAL_TMPL = "📊 *{signal} Signal* for `{stock}`\nRSI: {rsi:.2f}\n⏱ {time}"
 
-# Timezone
-IST = pytz.timezone("Asia/Kolkata")
+# Shared HTTP session: keep-alive pool plus retry on rate limits / 5xx
+def create_session():
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.3,
+                  status_forcelist=[429, 500, 502, 503, 504], allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+SESSION = create_session()
 
 # Indices and stock lists
 NIFTY50 = ["RELIANCE.NS","HDFCBANK.NS","ICICIBANK.NS","INFY.NS","TCS.NS","LT.NS","ITC.NS","SBIN.NS","KOTAKBANK.NS","AXISBANK.NS"]
 BANKNIFTY = ["HDFCBANK.NS","ICICIBANK.NS","SBIN.NS","KOTAKBANK.NS","AXISBANK.NS","PNB.NS","BANKBARODA.NS","INDUSINDBK.NS"]
 SENSEX = ["RELIANCE.NS","HDFCBANK.NS","ICICIBANK.NS","INFY.NS","TCS.NS","ITC.NS","LT.NS","SBIN.NS","AXISBANK.NS","BHARTIARTL.NS"]
 
-ALL_STOCKS = list(set(NIFTY50 + BANKNIFTY + SENSEX))
+ALL_STOCKS = tuple(dict.fromkeys(NIFTY50 + BANKNIFTY + SENSEX))
+
+# Parallel download workers (yfinance's default is 2x CPU count)
+MAX_WORKERS = 10
+# Yahoo serves at most ~20 tickers per multi-ticker request
+BATCH_SIZE = 20
 
-def fetch_data(symbol):
+RSI_PERIOD = 14
+
+# One batched request for a group of tickers, split into per-symbol frames
+def fetch_batch(symbols):
     try:
-        data = yf.download(symbol, period="1d", interval="10m", progress=False, auto_adjust=True)
-        return data
+        data = yf.download(
+            tickers=list(symbols), period="1d", interval="10m",
+            group_by="ticker", threads=MAX_WORKERS, progress=False, auto_adjust=True,
+        )
     except Exception as e:
-        print(f"❌ Error fetching {symbol}: {e}")
-        return None
-
-def calc_rsi(data, period=14):
-    delta = data["Close"].diff()
-    gain = np.where(delta > 0, delta, 0)
-    loss = np.where(delta < 0, -delta, 0)
-    avg_gain = pd.Series(gain).rolling(period).mean()
-    avg_loss = pd.Series(loss).rolling(period).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi.iloc[-1]
+        print(f"❌ Error fetching {len(symbols)} symbols: {e}")
+        return {}
+
+    frames = {}
+    for symbol in symbols:
+        if symbol not in data.columns.get_level_values(0):
+            print(f"❌ No data for {symbol}")
+            continue
+        frames[symbol] = data[symbol].dropna(how="all")
+    return frames
+
+def fetch_data_bulk(symbols):
+    frames = {}
+    for i in range(0, len(symbols), BATCH_SIZE):
+        frames.update(fetch_batch(symbols[i:i + BATCH_SIZE]))
+    return frames
+
+# Latest RSI for every column of a (bars x stocks) close matrix:
+# average the last `period` price changes of each stock in one pass
+def calc_rsi(closes, period=RSI_PERIOD):
+    delta = np.diff(closes[-(period + 1):], axis=0)
+    avg_gain = np.where(delta > 0, delta, 0.0).mean(axis=0)
+    avg_loss = np.where(delta < 0, -delta, 0.0).mean(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
 
 def send_telegram(msg):
+    if TELEGRAM_URL is None:
+        print(f"⚠️ Telegram credentials not set, not sending: {msg}")
+        return
     try:
-        url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
         data = {"chat_id": CHAT_ID, "text": msg, "parse_mode": "Markdown"}
-        requests.post(url, data=data)
+        SESSION.post(TELEGRAM_URL, data=data, timeout=5)
         print(f"📩 Telegram sent: {msg}")
     except Exception as e:
         print(f"⚠️ Telegram send error: {e}")
 
+# Pack messages into as few sends as Telegram's 4096-char limit allows
+def send_telegram_batch(msgs):
+    batch, size = [], 0
+    for msg in msgs:
+        if batch and size + 2 + len(msg) > TELEGRAM_MAX_LEN:
+            send_telegram("\n\n".join(batch))
+            batch, size = [], 0
+        size += len(msg) + 2 if batch else len(msg)
+        batch.append(msg)
+    if batch:
+        send_telegram("\n\n".join(batch))
+
 def main():
     now = dt.datetime.now(IST)
-    print(f"⏰ Running RSI Bot at {now.strftime('%H:%M:%S')}")
+    now_str = now.strftime('%H:%M:%S')
+    print(f"⏰ Running RSI Bot at {now_str}")
 
-    # Only run during Indian market hours
-    if now.weekday() >= 5 or now.hour < 9 or (now.hour == 9 and now.minute < 15) or now.hour >= 15:
+    if not is_market_open(now):
         print("🕒 Market closed — skipping run.")
         return
 
-    for stock in ALL_STOCKS:
-        data = fetch_data(stock)
-        if data is None or len(data) < 15:
-            continue
+    frames = fetch_data_bulk(ALL_STOCKS)
+    stocks = [s for s in ALL_STOCKS if s in frames and len(frames[s]) > RSI_PERIOD]
+    if not stocks:
+        print("⚠️ No usable data — skipping run.")
+        return
 
-        rsi = calc_rsi(data)
+    closes = np.column_stack([
+        frames[s]["Close"].to_numpy(dtype=np.float64)[-(RSI_PERIOD + 1):] for s in stocks
+    ])
+    rsis = calc_rsi(closes)
+
+    signals = []
+    for stock, rsi in zip(stocks, rsis):
         signal = None
         if rsi < 30:
             signal = "BUY"
@@ -69,10 +143,11 @@ def main():
             signal = "SELL"
 
         if signal:
-            msg = f"📊 *{signal} Signal* for `{stock}`\nRSI: {rsi:.2f}\n⏱ {now.strftime('%H:%M:%S')}"
-            send_telegram(msg)
+            signals.append(SIGNAL_TMPL.format(signal=signal, stock=stock, rsi=rsi, time=now_str))
         else:
             print(f"{stock} RSI={rsi:.2f} — no signal")
 
+    send_telegram_batch(signals)
+
 if __name__ == "__main__":
     main()